@@ -1,9 +1,17 @@
+import importlib
+import concurrent.futures
 from core.utils import *
-from core.asr_backend.demucs_vl import demucs_audio
-from core.asr_backend.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, normalize_audio_volume
+from core.asr_backend.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, save_language, normalize_audio_volume
 from core._1_ytdlp import find_video_files
 from core.utils.models import *
 
+# runtime -> (module, transcribe function, label); the backend module is only imported once selected
+ASR_BACKENDS = {
+    "local": ("core.asr_backend.whisperX_local", "transcribe_audio", "local model"),
+    "cloud": ("core.asr_backend.whisperX_302", "transcribe_audio_302", "302 API"),
+    "elevenlabs": ("core.asr_backend.elevenlabs_asr", "transcribe_audio_elevenlabs", "ElevenLabs API"),
+}
+
 @check_file_exists(_2_CLEANED_CHUNKS)
 def transcribe():
     # 1. video to audio
@@ -12,6 +20,8 @@ def transcribe():
 
     # 2. Demucs vocal separation:
     if load_key("demucs"):
+        # torch + demucs are only imported when separation is enabled
+        from core.asr_backend.demucs_vl import demucs_audio
         demucs_audio()
         vocal_audio = normalize_audio_volume(_VOCAL_AUDIO_FILE, _VOCAL_AUDIO_FILE, format="mp3")
     else:
@@ -23,19 +33,28 @@ def transcribe():
     # 4. Transcribe audio by clips
     all_results = []
     runtime = load_key("whisper.runtime")
-    if runtime == "local":
-        from core.asr_backend.whisperX_local import transcribe_audio as ts
-        rprint("[cyan]🎤 Transcribing audio with local model...[/cyan]")
-    elif runtime == "cloud":
-        from core.asr_backend.whisperX_302 import transcribe_audio_302 as ts
-        rprint("[cyan]🎤 Transcribing audio with 302 API...[/cyan]")
-    elif runtime == "elevenlabs":
-        from core.asr_backend.elevenlabs_asr import transcribe_audio_elevenlabs as ts
-        rprint("[cyan]🎤 Transcribing audio with ElevenLabs API...[/cyan]")
+    if runtime not in ASR_BACKENDS:
+        raise ValueError(f"Unsupported whisper.runtime: {runtime}")
+    module_name, func_name, label = ASR_BACKENDS[runtime]
+    ts = getattr(importlib.import_module(module_name), func_name)
+    rprint(f"[cyan]🎤 Transcribing audio with {label}...[/cyan]")
 
-    for start, end in segments:
-        result = ts(_RAW_AUDIO_FILE, vocal_audio, start, end)
-        all_results.append(result)
+    if runtime == "local":
+        from core.asr_backend.whisperX_local import release_resident_models
+        # models stay loaded across segments, then are freed once transcription ends
+        try:
+            for start, end in segments:
+                result = ts(_RAW_AUDIO_FILE, vocal_audio, start, end)
+                all_results.append(result)
+        finally:
+            release_resident_models()
+    else:
+        # cloud backends are network-bound, so send the clips concurrently (results keep segment order)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
+            all_results = list(executor.map(lambda seg: ts(_RAW_AUDIO_FILE, vocal_audio, *seg), segments))
+        # written once from the ordered results, so the last clip wins rather than the last to finish
+        if runtime == "elevenlabs" and all_results and 'language' in all_results[-1]:
+            save_language(all_results[-1]['language'])
     
     # 5. Combine results
     combined_result = {'segments': []}
@@ -7,8 +7,6 @@ from core.utils.models import *
 import pandas as pd
 import soundfile as sf
 console = Console()
-from core.asr_backend.demucs_vl import demucs_audio
-from core.utils.models import *
 
 def time_to_samples(time_str, sr):
     """Unified time conversion function"""
@@ -24,6 +22,7 @@ def extract_audio(audio_data, sr, start_time, end_time, out_file):
     sf.write(out_file, audio_data[start:end], sr)
 
 def extract_refer_audio_main():
+    from core.asr_backend.demucs_vl import demucs_audio
     demucs_audio() #!!! in case demucs not run
     if os.path.exists(os.path.join(_AUDIO_SEGS_DIR, '1.wav')):
         rprint(Panel("Audio segments already exist, skipping extraction", title="Info", border_style="blue"))
@@ -1,27 +1,27 @@
-# use try-except to avoid error when installing
-try:
-    from . import (
-        _1_ytdlp,
-        _2_asr,
-        _3_1_split_nlp,
-        _3_2_split_meaning,
-        _4_1_summarize,
-        _4_2_translate,
-        _5_split_sub,
-        _6_gen_sub,
-        _7_sub_into_vid,
-        _8_1_audio_task,
-        _8_2_dub_chunks,
-        _9_refer_audio,
-        _10_gen_audio,
-        _11_merge_audio,
-        _12_dub_to_vid
-    )
-    from .utils import *
-    from .utils.onekeycleanup import cleanup
-    from .utils.delete_retry_dubbing import delete_dubbing_files
-except ImportError:
-    pass
+import importlib
+
+# ------------
+# lazy exports (PEP 562): importing a submodule such as core.utils.config_utils
+# no longer loads every pipeline stage and its heavy dependencies
+# ------------
+
+_LAZY_ATTRS = {
+    'ask_gpt': '.utils',
+    'load_key': '.utils',
+    'update_key': '.utils',
+    'cleanup': '.utils.onekeycleanup',
+    'delete_dubbing_files': '.utils.delete_retry_dubbing',
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    elif name in __all__:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 __all__ = [
     'ask_gpt',
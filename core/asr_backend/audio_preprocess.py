@@ -1,91 +1,223 @@
-import os, subprocess
+import os, re, subprocess
+import json, time
+import hashlib
+import functools
+import numpy as np
 import pandas as pd
+import soundfile as sf
+import soxr
 from typing import Dict, List, Tuple
-from pydub import AudioSegment
 from core.utils import *
 from core.utils.models import *
-from pydub import AudioSegment
-from pydub.silence import detect_silence
-from pydub.utils import mediainfo
 from rich import print as rprint
 
+# keep Windows from allocating a console for every short-lived ffprobe
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
 def normalize_audio_volume(audio_path, output_path, target_db = -20.0, format = "wav"):
-    audio = AudioSegment.from_file(audio_path)
-    change_in_dBFS = target_db - audio.dBFS
-    normalized_audio = audio.apply_gain(change_in_dBFS)
-    normalized_audio.export(output_path, format=format)
-    rprint(f"[green]✅ Audio normalized from {audio.dBFS:.1f}dB to {target_db:.1f}dB[/green]")
+    # pass 1: volumedetect reports the mean (RMS) level in dBFS, same measure as pydub's dBFS
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-nostats', '-i', audio_path, '-af', 'volumedetect', '-f', 'null', '-'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed to measure volume of {audio_path}: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+    match = re.search(r'mean_volume:\s*(-?[\d.]+|-inf) dB', result.stderr.decode('utf-8', errors='ignore'))
+    if match is None:
+        raise RuntimeError(f"Failed to measure volume of {audio_path}")
+    mean_db = float(match.group(1))
+    gain = target_db - mean_db if mean_db != float('-inf') else 0.0
+    # pass 2: apply the gain; write to a temp file first since output_path may be audio_path
+    tmp_path = f"{output_path}.tmp"
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', audio_path, '-af', f'volume={gain:.2f}dB', '-f', format, tmp_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"FFmpeg failed to normalize {audio_path}: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+    os.replace(tmp_path, output_path)
+    rprint(f"[green]✅ Audio normalized from {mean_db:.1f}dB to {target_db:.1f}dB[/green]")
     return output_path
 
+def load_audio_segment(audio_file, start = None, end = None, sr = 16000):
+    """Decode only the [start, end) window of audio_file as mono float32 at `sr`, instead of the whole file."""
+    try:
+        with sf.SoundFile(audio_file) as f:
+            file_sr = f.samplerate
+            start_frame = min(int(start * file_sr), f.frames) if start is not None else 0
+            end_frame = min(int(end * file_sr), f.frames) if end is not None else f.frames
+            f.seek(start_frame)
+            audio = f.read(frames=max(end_frame - start_frame, 0), dtype='float32', always_2d=True)
+    except sf.LibsndfileError:
+        # libsndfile builds before 1.1 cannot read mp3; let ffmpeg decode the same window
+        return decode_range(audio_file, start or 0.0, end, sr).copy()
+    audio = audio.mean(axis=1)
+    if file_sr != sr:
+        audio = soxr.resample(audio, file_sr, sr, quality='HQ')
+    return audio
+
+def audio_cache_key(audio_file, *parts):
+    """Short key that changes when audio_file is rewritten (size/mtime) or any of `parts` changes."""
+    stat = os.stat(audio_file)
+    raw = "|".join(str(p) for p in (stat.st_size, stat.st_mtime_ns, *parts))
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+# ------------
+# HTTP session shared by the cloud ASR backends (keep-alive + retry on 429/5xx)
+# ------------
+
+@functools.lru_cache(maxsize=None)
+def cloud_session():
+    """One keep-alive session for every clip, so only the first request pays for TLS."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=16, max_retries=Retry(
+        total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None, raise_on_status=False)))
+    return session
+
+# ------------
+# negative cache for permanently rejected cloud ASR requests
+# ------------
+
+PERMANENT_HTTP_ERRORS = {400, 413, 422}
+
+def check_failed_request(log_file):
+    """Raise right away if this exact request was already rejected as invalid, instead of re-uploading it."""
+    fail_file = log_file.replace(".json", "_fail.json")
+    if os.path.exists(fail_file):
+        with open(fail_file, "r", encoding="utf-8") as f:
+            fail = json.load(f)
+        raise RuntimeError(f"Request was rejected before with HTTP {fail['status']}: {fail['message']} (delete {fail_file} to retry)")
+
+def raise_for_response(response, log_file):
+    """Remember permanent 4xx rejections next to log_file; transient 429/5xx are never cached."""
+    if response.status_code in PERMANENT_HTTP_ERRORS:
+        fail_file = log_file.replace(".json", "_fail.json")
+        os.makedirs(os.path.dirname(fail_file), exist_ok=True)
+        with open(fail_file, "w", encoding="utf-8") as f:
+            json.dump({"status": response.status_code, "message": response.text[:1000], "time": time.time()}, f, indent=4, ensure_ascii=False)
+    response.raise_for_status()
+
+def probe_audio_stream(media_file: str):
+    """(codec_name, sample_rate, channels) of the first audio stream, or None if it cannot be probed."""
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+           '-show_entries', 'stream=codec_name,sample_rate,channels', '-of', 'json', media_file]
+    try:
+        stream = json.loads(subprocess.check_output(cmd, creationflags=NO_WINDOW))['streams'][0]
+        return stream['codec_name'], int(stream['sample_rate']), int(stream['channels'])
+    except (subprocess.CalledProcessError, ValueError, KeyError, IndexError):
+        return None
+
 def convert_video_to_audio(video_file: str):
     os.makedirs(_AUDIO_DIR, exist_ok=True)
     if not os.path.exists(_RAW_AUDIO_FILE):
         rprint(f"[blue]🎬➡️🎵 Converting to high quality audio with FFmpeg ......[/blue]")
-        subprocess.run([
-            'ffmpeg', '-y', '-i', video_file, '-vn',
-            '-c:a', 'libmp3lame', '-b:a', '32k',
-            '-ar', '16000',
-            '-ac', '1', 
+        # already 16 kHz mono mp3 (e.g. an audio-only input): remux instead of re-encoding
+        if probe_audio_stream(video_file) == ('mp3', 16000, 1):
+            audio_args = ['-c:a', 'copy']
+        else:
+            audio_args = ['-c:a', 'libmp3lame', '-b:a', '32k', '-ar', '16000', '-ac', '1']
+        result = subprocess.run([
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', video_file, '-vn',
+            *audio_args,
             '-metadata', 'encoding=UTF-8', _RAW_AUDIO_FILE
-        ], check=True, stderr=subprocess.PIPE)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to convert {video_file}: {result.stderr.decode('utf-8', errors='ignore').strip()}")
         rprint(f"[green]🎬➡️🎵 Converted <{video_file}> to <{_RAW_AUDIO_FILE}> with FFmpeg\n[/green]")
 
 def get_audio_duration(audio_file: str) -> float:
-    """Get the duration of an audio file using ffmpeg."""
-    cmd = ['ffmpeg', '-i', audio_file]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    _, stderr = process.communicate()
-    output = stderr.decode('utf-8', errors='ignore')
-    
+    """Get the duration of an audio file using ffprobe."""
+    try:
+        st = os.stat(audio_file)
+    except OSError as e:
+        rprint(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
+        return 0
+    return probe_audio_duration(audio_file, st.st_size, st.st_mtime_ns)
+
+# keyed on size + mtime so a rewritten file is probed again
+@functools.lru_cache(maxsize=256)
+def probe_audio_duration(audio_file, size, mtime_ns):
+    # format=duration comes from the container header, no decoder is opened
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', audio_file]
     try:
-        duration_str = [line for line in output.split('\n') if 'Duration' in line][0]
-        duration_parts = duration_str.split('Duration: ')[1].split(',')[0].split(':')
-        duration = float(duration_parts[0])*3600 + float(duration_parts[1])*60 + float(duration_parts[2])
-    except Exception as e:
-        print(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
-        duration = 0
-    return duration
+        return float(subprocess.check_output(cmd, creationflags=NO_WINDOW))
+    except (subprocess.CalledProcessError, ValueError) as e:
+        rprint(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
+        return 0
+
+def decode_range(audio_file: str, start: float, end: float = None, sr: int = 8000) -> np.ndarray:
+    """Decode only [start, end) seconds of audio_file (to the end of file if `end` is None) to mono float32 at `sr` through an ffmpeg pipe."""
+    # -ss before -i seeks the input instead of decoding and discarding everything up to `start`
+    duration = ['-t', f'{end - start:.6f}'] if end is not None else []
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', f'{start:.6f}', *duration, '-i', audio_file,
+           '-ac', '1', '-ar', str(sr), '-f', 'f32le', '-']
+    return np.frombuffer(subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout, dtype=np.float32)
+
+def detect_silence_regions(samples: np.ndarray, sr: int, min_silence_len: float = 0.5, silence_thresh: float = -30, step: float = 0.001) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized pydub.silence.detect_silence: start and end sample indices of the runs where the sliding RMS is <= silence_thresh dBFS."""
+    win = int(min_silence_len * sr)
+    if len(samples) < win:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    hop = max(int(step * sr), 1)
+    # window energies from a running sum of squares instead of one RMS per window
+    energy = np.concatenate(([0.0], np.cumsum(np.square(samples, dtype=np.float64))))
+    starts = np.arange(0, len(samples) - win + 1, hop)
+    silent = np.sqrt((energy[starts + win] - energy[starts]) / win) <= 10 ** (silence_thresh / 20)
+    edges = np.diff(silent.astype(np.int8), prepend=0, append=0)
+    region_starts = starts[np.flatnonzero(edges == 1)]
+    region_ends = starts[np.flatnonzero(edges == -1) - 1] + win
+    if len(region_starts) == 0:
+        return region_starts, region_ends
+    # like pydub, runs whose windows overlap or touch form one region
+    new_region = np.concatenate(([True], region_starts[1:] > region_ends[:-1]))
+    first = np.flatnonzero(new_region)
+    last = np.append(first[1:] - 1, len(region_ends) - 1)
+    return region_starts[first], region_ends[last]
 
 def split_audio(audio_file: str, target_len: float = 30*60, win: float = 60) -> List[Tuple[float, float]]:
-    ## 在 [target_len-win, target_len+win] 区间内用 pydub 检测静默，切分音频
+    ## 在 [target_len-win, target_len+win] 区间内检测静默，切分音频
     rprint(f"[blue]🎙️ Starting audio segmentation {audio_file} {target_len} {win}[/blue]")
-    audio = AudioSegment.from_file(audio_file)
-    duration = float(mediainfo(audio_file)["duration"])
+    duration = get_audio_duration(audio_file)
+    if duration <= 0:
+        raise ValueError(f"Failed to get duration of {audio_file}")
     if duration <= target_len + win:
         return [(0, duration)]
-    segments, pos = [], 0.0
-    safe_margin = 0.5  # 静默点前后安全边界，单位秒
+    # walk the file in integer sample positions at the silence-detection rate; seconds only on output
+    sr = 8000
+    total, target, half_win = int(duration * sr), int(target_len * sr), int(win * sr)
+    margin = int(0.5 * sr)  # 静默点前后安全边界，0.5秒
+    segments, pos = [], 0
 
-    while pos < duration:
-        if duration - pos <= target_len:
-            segments.append((pos, duration)); break
+    while pos < total:
+        if total - pos <= target:
+            segments.append((pos / sr, duration)); break
 
-        threshold = pos + target_len
-        ws, we = int((threshold - win) * 1000), int((threshold + win) * 1000)
-        
-        # 获取完整的静默区域
-        silence_regions = detect_silence(audio[ws:we], min_silence_len=int(safe_margin*1000), silence_thresh=-30)
-        silence_regions = [(s/1000 + (threshold - win), e/1000 + (threshold - win)) for s, e in silence_regions]
+        threshold = pos + target
+        ws = threshold - half_win
+        # 只解码搜索窗口，获取完整的静默区域
+        window = decode_range(audio_file, ws / sr, (threshold + half_win) / sr, sr)
+        starts, ends = detect_silence_regions(window, sr, min_silence_len=margin / sr, silence_thresh=-30)
+        starts, ends = starts + ws, ends + ws
         # 筛选长度足够（至少1秒）且位置适合的静默区域
-        valid_regions = [
-            (start, end) for start, end in silence_regions 
-            if (end - start) >= (safe_margin * 2) and threshold <= start + safe_margin <= threshold + win
-        ]
+        valid = (ends - starts >= margin * 2) & (threshold <= starts + margin) & (starts + margin <= threshold + half_win)
         
-        if valid_regions:
-            start, end = valid_regions[0]
-            split_at = start + safe_margin  # 在静默区域起始点后0.5秒处切分
+        if valid.any():
+            split_at = int(starts[valid.argmax()]) + margin  # 在静默区域起始点后0.5秒处切分
         else:
-            rprint(f"[yellow]⚠️ No valid silence regions found for {audio_file} at {threshold}s, using threshold[/yellow]")
+            rprint(f"[yellow]⚠️ No valid silence regions found for {audio_file} at {threshold / sr}s, using threshold[/yellow]")
             split_at = threshold
             
-        segments.append((pos, split_at)); pos = split_at
+        segments.append((pos / sr, split_at / sr)); pos = split_at
 
     rprint(f"[green]🎙️ Audio split completed {len(segments)} segments[/green]")
     return segments
 
+GUILLEMETS = re.compile(r'[»«]')
+
 def process_transcription(result: Dict) -> pd.DataFrame:
-    all_words = []
+    # build columns directly instead of one dict per word
+    texts, starts, ends, speaker_ids = [], [], [], []
     for segment in result['segments']:
         # Get speaker_id, if not exists, set to None
         speaker_id = segment.get('speaker_id', None)
@@ -96,62 +228,51 @@ def process_transcription(result: Dict) -> pd.DataFrame:
                 rprint(f"[yellow]⚠️ Warning: Detected word longer than 30 characters, skipping: {word['word']}[/yellow]")
                 continue
                 
-            # ! For French, we need to convert guillemets to empty strings
-            word["word"] = word["word"].replace('»', '').replace('«', '')
-            
             if 'start' not in word and 'end' not in word:
-                if all_words:
+                if ends:
                     # Assign the end time of the previous word as the start and end time of the current word
-                    word_dict = {
-                        'text': word["word"],
-                        'start': all_words[-1]['end'],
-                        'end': all_words[-1]['end'],
-                        'speaker_id': speaker_id
-                    }
-                    all_words.append(word_dict)
+                    start = end = ends[-1]
                 else:
                     # If it's the first word, look next for a timestamp then assign it to the current word
                     next_word = next((w for w in segment['words'] if 'start' in w and 'end' in w), None)
                     if next_word:
-                        word_dict = {
-                            'text': word["word"],
-                            'start': next_word["start"],
-                            'end': next_word["end"],
-                            'speaker_id': speaker_id
-                        }
-                        all_words.append(word_dict)
+                        start, end = next_word["start"], next_word["end"]
                     else:
                         raise Exception(f"No next word with timestamp found for the current word : {word}")
             else:
                 # Normal case, with start and end times
-                word_dict = {
-                    'text': f'{word["word"]}',
-                    'start': word.get('start', all_words[-1]['end'] if all_words else 0),
-                    'end': word['end'],
-                    'speaker_id': speaker_id
-                }
-                
-                all_words.append(word_dict)
+                start = word.get('start', ends[-1] if ends else 0)
+                end = word['end']
+            
+            texts.append(word["word"])
+            starts.append(start)
+            ends.append(end)
+            speaker_ids.append(speaker_id)
     
-    return pd.DataFrame(all_words)
+    df = pd.DataFrame({'text': texts, 'start': starts, 'end': ends, 'speaker_id': speaker_ids})
+    # ! For French, we need to convert guillemets to empty strings
+    df['text'] = df['text'].str.replace(GUILLEMETS, '', regex=True)
+    return df
 
 def save_results(df: pd.DataFrame):
     os.makedirs('output/log', exist_ok=True)
 
+    # measure text lengths once; both filters and reports reuse them
+    lens = df['text'].str.len()
+    non_empty, too_long = lens > 0, lens > 30
+
     # Remove rows where 'text' is empty
-    initial_rows = len(df)
-    df = df[df['text'].str.len() > 0]
-    removed_rows = initial_rows - len(df)
+    removed_rows = int((~non_empty).sum())
     if removed_rows > 0:
         rprint(f"[blue]ℹ️ Removed {removed_rows} row(s) with empty text.[/blue]")
     
-    # Check for and remove words longer than 20 characters
-    long_words = df[df['text'].str.len() > 30]
-    if not long_words.empty:
-        rprint(f"[yellow]⚠️ Warning: Detected {len(long_words)} word(s) longer than 30 characters. These will be removed.[/yellow]")
-        df = df[df['text'].str.len() <= 30]
+    # Check for and remove words longer than 30 characters
+    long_words = int(too_long.sum())
+    if long_words > 0:
+        rprint(f"[yellow]⚠️ Warning: Detected {long_words} word(s) longer than 30 characters. These will be removed.[/yellow]")
+    df = df[non_empty & ~too_long].copy()
     
-    df['text'] = df['text'].apply(lambda x: f'"{x}"')
+    df['text'] = '"' + df['text'] + '"'
     df.to_excel(_2_CLEANED_CHUNKS, index=False)
     rprint(f"[green]📊 Excel file saved to {_2_CLEANED_CHUNKS}[/green]")
 
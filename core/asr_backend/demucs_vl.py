@@ -1,24 +1,61 @@
 import os
+import subprocess
 import torch
 from rich.console import Console
 from rich import print as rprint
 from demucs.pretrained import get_model
-from demucs.audio import save_audio
 from torch.cuda import is_available as is_cuda_available
 from typing import Optional
 from demucs.api import Separator
 from demucs.apply import BagOfModels
 import gc
+import functools
+import concurrent.futures
 from core.utils.models import *
 
+# read at the first CUDA allocation, not at `import torch`; growable segments keep the allocator
+# from fragmenting between long segments. torch < 2.1 (the pinned CUDA install) rejects the option
+if os.name != 'nt' and torch.__version__ >= "2.1":
+    os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
+
 class PreloadedSeparator(Separator):
-    def __init__(self, model: BagOfModels, shifts: int = 1, overlap: float = 0.25,
+    def __init__(self, model: BagOfModels, shifts: int = 0, overlap: float = 0.25,
                  split: bool = True, segment: Optional[int] = None, jobs: int = 0):
         self._model, self._audio_channels, self._samplerate = model, model.audio_channels, model.samplerate
         device = "cuda" if is_cuda_available() else "mps" if torch.backends.mps.is_available() else "cpu"
         self.update_parameter(device=device, shifts=shifts, overlap=overlap, split=split,
                             segment=segment, jobs=jobs, progress=True, callback=None, callback_arg=None)
 
+@functools.lru_cache(maxsize=2)
+def get_demucs_model(model_name):
+    # parsed once per process; batch mode separates every video with the same weights
+    return get_model(model_name)
+
+def save_mp3(wav, path, samplerate, bitrate=128, chunk_seconds=10):
+    """Stream a (channels, samples) stem into ffmpeg as 16-bit PCM, one chunk at a time."""
+    # same "rescale" clipping as demucs.audio.save_audio, applied per chunk
+    scale = 2**15 / max(1.01 * wav.abs().max().item(), 1)
+    cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+           '-f', 's16le', '-ar', str(samplerate), '-ac', str(wav.shape[0]), '-i', '-',
+           '-c:a', 'libmp3lame', '-b:a', f'{bitrate}k', '-compression_level', '2', path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    step = samplerate * chunk_seconds
+    try:
+        for i in range(0, wav.shape[-1], step):
+            chunk = (wav[:, i:i + step] * scale).clamp_(-2**15, 2**15 - 1).short()
+            proc.stdin.write(chunk.t().contiguous().cpu().numpy().tobytes())
+    except BrokenPipeError:
+        # ffmpeg exited early; its return code below says why
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode {path} (exit code {returncode})")
+
 def demucs_audio():
     if os.path.exists(_VOCAL_AUDIO_FILE) and os.path.exists(_BACKGROUND_AUDIO_FILE):
         rprint(f"[yellow]⚠️ {_VOCAL_AUDIO_FILE} and {_BACKGROUND_AUDIO_FILE} already exist, skip Demucs processing.[/yellow]")
@@ -28,25 +65,36 @@ def demucs_audio():
     os.makedirs(_AUDIO_DIR, exist_ok=True)
     
     console.print("🤖 Loading <htdemucs> model...")
-    model = get_model('htdemucs')
-    separator = PreloadedSeparator(model=model, shifts=1, overlap=0.25)
+    model = get_demucs_model('htdemucs')
+    separator = PreloadedSeparator(model=model, shifts=0, overlap=0.25)
     
     console.print("🎵 Separating audio...")
-    _, outputs = separator.separate_audio_file(_RAW_AUDIO_FILE)
-    
-    kwargs = {"samplerate": model.samplerate, "bitrate": 128, "preset": 2, 
-             "clip": "rescale", "as_float": False, "bits_per_sample": 16}
+    with torch.inference_mode():
+        _, outputs = separator.separate_audio_file(_RAW_AUDIO_FILE)
     
-    console.print("🎤 Saving vocals track...")
-    save_audio(outputs['vocals'].cpu(), _VOCAL_AUDIO_FILE, **kwargs)
+    # accumulate in place: sum() allocates a new stem-sized tensor per `+`
+    background = None
+    for source, audio in outputs.items():
+        if source == 'vocals':
+            continue
+        if background is None:
+            background = audio.clone()
+        else:
+            background.add_(audio)
     
-    console.print("🎹 Saving background music...")
-    background = sum(audio for source, audio in outputs.items() if source != 'vocals')
-    save_audio(background.cpu(), _BACKGROUND_AUDIO_FILE, **kwargs)
+    # the two MP3 encodes are independent, run them side by side
+    console.print("🎤 Saving vocals track and 🎹 background music...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(save_mp3, outputs['vocals'], _VOCAL_AUDIO_FILE, model.samplerate),
+                   executor.submit(save_mp3, background, _BACKGROUND_AUDIO_FILE, model.samplerate)]
+        for future in futures:
+            future.result()
     
-    # Clean up memory
+    # Clean up memory (the model itself stays cached); return cached VRAM so WhisperX (CTranslate2 has its own allocator) can use it
     del outputs, background, model, separator
     gc.collect()
+    if is_cuda_available():
+        torch.cuda.empty_cache()
     
     console.print("[green]✨ Audio separation completed![/green]")
 
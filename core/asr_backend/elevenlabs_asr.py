@@ -1,12 +1,12 @@
 import os
+import io
 import json
 import time
-import requests
-import tempfile
-import librosa
+import numpy as np
 import soundfile as sf
 from rich import print as rprint
 from core.utils import *
+from core.asr_backend.audio_preprocess import load_audio_segment, audio_cache_key, check_failed_request, raise_for_response, cloud_session
 
 # ----------------------------------------
 # ISO 639-2 to 1
@@ -35,104 +35,88 @@ def elev2whisper(elev_json, word_level_timestamp = False):
     if not words:
         return {"segments": []}
 
-    segments, seg = [], {
-        "text": "",                     # accumulated text
-        "start": words[0]["start"],     # seg start time
-        "end": words[0]["end"],         # seg end time (updates)
-        "speaker_id": words[0]["speaker_id"],
-        "words": []                       # optional per‑word info
-    }
+    # break before any word that follows a pause > SPLIT_GAP or a speaker change
+    starts = np.fromiter((w["start"] for w in words), float, len(words))
+    ends = np.fromiter((w["end"] for w in words), float, len(words))
+    speakers = np.array([w["speaker_id"] for w in words], dtype=object)
+    split_mask = (starts[1:] - ends[:-1] > SPLIT_GAP) | (speakers[1:] != speakers[:-1])
+    bounds = [0, *(np.flatnonzero(split_mask) + 1).tolist(), len(words)]
 
-    for prev, nxt in zip(words, words[1:] + [None]):  # pairwise with sentinel
-        seg["text"] += prev["text"]
-        seg["end"] = prev["end"]
+    segments = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        seg_words = words[lo:hi]
+        seg = {
+            "text": "".join(w["text"] for w in seg_words).strip(),
+            "start": seg_words[0]["start"],
+            "end": seg_words[-1]["end"],
+            "speaker_id": seg_words[0]["speaker_id"],
+        }
         if word_level_timestamp:
-            seg["words"].append({"text": prev["text"], "start": prev["start"], "end": prev["end"]})
-        # decide whether to break the segment
-        if nxt is None or (nxt["start"] - prev["end"] > SPLIT_GAP) or (nxt["speaker_id"] != seg["speaker_id"]):
-            seg["text"] = seg["text"].strip()
-            if not word_level_timestamp:
-                seg.pop("words")
-            segments.append(seg)
-            if nxt is not None:  # seed next segment
-                seg = {
-                    "text": "",
-                    "start": nxt["start"],
-                    "end": nxt["end"],
-                    "speaker_id": nxt["speaker_id"],
-                    "words": []
-                }
+            seg["words"] = [{"text": w["text"], "start": w["start"], "end": w["end"]} for w in seg_words]
+        segments.append(seg)
     return {"segments": segments}
 
 def transcribe_audio_elevenlabs(raw_audio_path, vocal_audio_path, start = None, end = None):
     rprint(f"[cyan]🎤 Processing audio transcription, file path: {vocal_audio_path}[/cyan]")
-    LOG_FILE = f"output/log/elevenlabs_transcribe_{start}_{end}.json"
+    language = load_key("whisper.language")
+    LOG_FILE = f"output/log/elevenlabs_transcribe_{start}_{end}_{audio_cache_key(raw_audio_path, vocal_audio_path, language)}.json"
     if os.path.exists(LOG_FILE):
         with open(LOG_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
+    check_failed_request(LOG_FILE)
     
-    # Load audio and process start/end parameters
-    y, sr = librosa.load(vocal_audio_path, sr=16000)
-    audio_duration = len(y) / sr
+    # Decode only the requested window
+    sr = 16000
+    y_slice = load_audio_segment(vocal_audio_path, start, end, sr=sr)
     
     if start is None or end is None:
         start = 0
-        end = audio_duration
     
-    # Slice audio based on start/end
-    start_sample = int(start * sr)
-    end_sample = int(end * sr)
-    y_slice = y[start_sample:end_sample]
+    # Encode the slice in memory as FLAC: lossless and much cheaper to encode than MP3
+    audio_buffer = io.BytesIO()
+    sf.write(audio_buffer, y_slice, sr, format='FLAC')
+    audio_buffer.seek(0)
     
-    # Create temporary file for the sliced audio
-    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-        temp_filepath = temp_file.name
-        sf.write(temp_filepath, y_slice, sr, format='MP3')
+    api_key = load_key("whisper.elevenlabs_api_key")
+    base_url = "https://api.elevenlabs.io/v1/speech-to-text"
+    headers = {"xi-api-key": api_key}
     
-    try:
-        api_key = load_key("whisper.elevenlabs_api_key")
-        base_url = "https://api.elevenlabs.io/v1/speech-to-text"
-        headers = {"xi-api-key": api_key}
-        
-        data = {
-            "model_id": "scribe_v1",
-            "timestamps_granularity": "word",
-            "language_code": load_key("whisper.language"),
-            "diarize": True,
-            "num_speakers": None,
-            "tag_audio_events": False
-        }
+    data = {
+        "model_id": "scribe_v1",
+        "timestamps_granularity": "word",
+        "language_code": language,
+        "diarize": True,
+        "num_speakers": None,
+        "tag_audio_events": False
+    }
+    
+    files = {"file": ("audio_slice.flac", audio_buffer, 'audio/flac')}
+    start_time = time.time()
+    response = cloud_session().post(base_url, headers=headers, data=data, files=files)
         
-        with open(temp_filepath, 'rb') as audio_file:
-            files = {"file": (os.path.basename(temp_filepath), audio_file, 'audio/mpeg')}
-            start_time = time.time()
-            response = requests.post(base_url, headers=headers, data=data, files=files)
-            
-        rprint(f"[yellow]API request sent, status code: {response.status_code}[/yellow]")
-        result = response.json()
+    rprint(f"[yellow]API request sent, status code: {response.status_code}[/yellow]")
+    raise_for_response(response, LOG_FILE)
+    result = response.json()
 
-        # save detected language
-        detected_language = iso_639_2_to_1.get(result["language_code"], result["language_code"])
-        update_key("whisper.detected_language", detected_language)
+    # clips finish in any order; _2_asr saves the detected language from the last clip
+    language_code = result["language_code"]
+    detected_language = iso_639_2_to_1.get(language_code, language_code)
 
-        # Adjust timestamps for all words by adding the start time
-        if start is not None and 'words' in result:
-            for word in result['words']:
-                if 'start' in word:
-                    word['start'] += start
-                if 'end' in word:
-                    word['end'] += start
-        
-        rprint(f"[green]✓ Transcription completed in {time.time() - start_time:.2f} seconds[/green]")
-        parsed_result = elev2whisper(result)
-        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(parsed_result, f, indent=4, ensure_ascii=False)
-        return parsed_result
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
+    # Adjust timestamps for all words by adding the start time
+    if start is not None and 'words' in result:
+        for word in result['words']:
+            if 'start' in word:
+                word['start'] += start
+            if 'end' in word:
+                word['end'] += start
+    
+    rprint(f"[green]✓ Transcription completed in {time.time() - start_time:.2f} seconds[/green]")
+    parsed_result = elev2whisper(result)
+    parsed_result["language"] = detected_language
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    with open(LOG_FILE, "w", encoding="utf-8") as f:
+        json.dump(parsed_result, f, indent=4, ensure_ascii=False)
+    return parsed_result
 
 if __name__ == "__main__":
     file_path = input("Enter local audio file path (mp3 format): ")
@@ -2,39 +2,45 @@ import os
 import io
 import json
 import time
-import requests
-import librosa
-import soundfile as sf
+import wave
+import numpy as np
 from rich import print as rprint
 from core.utils import *
 from core.utils.models import *
+from core.asr_backend.audio_preprocess import load_audio_segment, audio_cache_key, check_failed_request, raise_for_response, cloud_session
 
 OUTPUT_LOG_DIR = "output/log"
+
+def pcm16_wav_buffer(y, sr):
+    """Wrap float samples as 16-bit PCM WAV in memory; only a header is added, no encoder runs."""
+    pcm = (np.clip(y, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sr)
+        wav.writeframes(pcm.tobytes())
+    buffer.seek(0)
+    return buffer
+
 def transcribe_audio_302(raw_audio_path: str, vocal_audio_path: str, start: float = None, end: float = None):
     os.makedirs(OUTPUT_LOG_DIR, exist_ok=True)
-    LOG_FILE = f"{OUTPUT_LOG_DIR}/whisperx302_{start}_{end}.json"
+    WHISPER_LANGUAGE = load_key("whisper.language")
+    LOG_FILE = f"{OUTPUT_LOG_DIR}/whisperx302_{start}_{end}_{audio_cache_key(raw_audio_path, vocal_audio_path, WHISPER_LANGUAGE)}.json"
     if os.path.exists(LOG_FILE):
         with open(LOG_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
+    check_failed_request(LOG_FILE)
         
-    WHISPER_LANGUAGE = load_key("whisper.language")
-    update_key("whisper.language", WHISPER_LANGUAGE)
     url = "https://api.302.ai/302/whisperx"
     
-    y, sr = librosa.load(vocal_audio_path, sr=16000)
-    audio_duration = len(y) / sr
+    sr = 16000
+    y_slice = load_audio_segment(vocal_audio_path, start, end, sr=sr)
     
     if start is None or end is None:
         start = 0
-        end = audio_duration
-        
-    start_sample = int(start * sr)
-    end_sample = int(end * sr)
-    y_slice = y[start_sample:end_sample]
     
-    audio_buffer = io.BytesIO()
-    sf.write(audio_buffer, y_slice, sr, format='WAV', subtype='PCM_16')
-    audio_buffer.seek(0)
+    audio_buffer = pcm16_wav_buffer(y_slice, sr)
     
     files = [('audio_input', ('audio_slice.wav', audio_buffer, 'application/octet-stream'))]
     payload = {"processing_type": "align", "language": WHISPER_LANGUAGE, "output": "raw"}
@@ -42,7 +48,8 @@ def transcribe_audio_302(raw_audio_path: str, vocal_audio_path: str, start: floa
     start_time = time.time()
     rprint(f"[cyan]🎤 Transcribing audio with language:  <{WHISPER_LANGUAGE}> ...[/cyan]")
     headers = {'Authorization': f'Bearer {load_key("whisper.whisperX_302_api_key")}'}
-    response = requests.request("POST", url, headers=headers, data=payload, files=files)
+    response = cloud_session().post(url, headers=headers, data=payload, files=files)
+    raise_for_response(response, LOG_FILE)
     
     response_json = response.json()
     
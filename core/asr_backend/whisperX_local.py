@@ -1,40 +1,122 @@
 import os
+import gc
+import json
+import functools
+import concurrent.futures
 import warnings
 import time
-import subprocess
+import socket
 import torch
+import ctranslate2
 import whisperx
-import librosa
 from rich import print as rprint
 from core.utils import *
+from core.asr_backend.audio_preprocess import load_audio_segment
 
 warnings.filterwarnings("ignore")
+# read at the first CUDA allocation, not at `import torch`; growable segments keep the allocator
+# from fragmenting between long segments. torch < 2.1 (the pinned CUDA install) rejects the option
+if os.name != 'nt' and torch.__version__ >= "2.1":
+    os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
 MODEL_DIR = load_key("model_dir")
+HF_MIRROR_CACHE = os.path.join(MODEL_DIR, "hf_mirror.json")
+HF_MIRROR_TTL = 24 * 3600
 
+def ping_mirror(domain):
+    # TCP connect to the HTTPS port: what the hub client needs, and no ICMP privileges required
+    start = time.time()
+    try:
+        with socket.create_connection((domain, 443), timeout=3):
+            pass
+    except OSError:
+        return False, float('inf')
+    return True, time.time() - start
+
+# probe at most once per process; mirrors are pinged concurrently
+@functools.lru_cache(maxsize=None)
 @except_handler("failed to check hf mirror", default_return=None)
 def check_hf_mirror():
+    # a user-set endpoint always wins
+    if os.environ.get('HF_ENDPOINT'):
+        return os.environ['HF_ENDPOINT']
+    # reuse the last probe result across runs while it is fresh
+    try:
+        with open(HF_MIRROR_CACHE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if time.time() - cached['ts'] < HF_MIRROR_TTL:
+            rprint(f"[cyan]🚀 Using cached mirror:[/cyan] {cached['url']}")
+            return cached['url']
+    except (OSError, ValueError, KeyError):
+        pass
+
     mirrors = {'Official': 'huggingface.co', 'Mirror': 'hf-mirror.com'}
     fastest_url = f"https://{mirrors['Official']}"
     best_time = float('inf')
     rprint("[cyan]🔍 Checking HuggingFace mirrors...[/cyan]")
-    for name, domain in mirrors.items():
-        if os.name == 'nt':
-            cmd = ['ping', '-n', '1', '-w', '3000', domain]
-        else:
-            cmd = ['ping', '-c', '1', '-W', '3', domain]
-        start = time.time()
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        response_time = time.time() - start
-        if result.returncode == 0:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(mirrors)) as executor:
+        results = dict(zip(mirrors, executor.map(ping_mirror, mirrors.values())))
+    for name, (ok, response_time) in results.items():
+        if ok:
             if response_time < best_time:
                 best_time = response_time
-                fastest_url = f"https://{domain}"
+                fastest_url = f"https://{mirrors[name]}"
             rprint(f"[green]✓ {name}:[/green] {response_time:.2f}s")
     if best_time == float('inf'):
         rprint("[yellow]⚠️ All mirrors failed, using default[/yellow]")
+    else:
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        with open(HF_MIRROR_CACHE, 'w', encoding='utf-8') as f:
+            json.dump({'url': fastest_url, 'ts': time.time()}, f)
     rprint(f"[cyan]🚀 Selected mirror:[/cyan] {fastest_url} ({best_time:.2f}s)")
     return fastest_url
 
+# ------------
+# models stay resident across segments; a new language or model evicts the old one
+# before its replacement loads, so the two never share VRAM
+# ------------
+
+_resident_args = {}
+
+def release_models(*loaders):
+    for loader in loaders:
+        loader.cache_clear()
+        _resident_args.pop(loader, None)
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def release_resident_models():
+    # single teardown point once every segment is transcribed; frees VRAM for Demucs / TTS that run next
+    release_models(load_whisper_model, load_align_model)
+
+def load_resident(loader, *args):
+    if _resident_args.get(loader) != args:
+        release_models(loader)
+        _resident_args[loader] = args
+    return loader(*args)
+
+@functools.lru_cache(maxsize=1)
+def load_whisper_model(model_name, device, compute_type, language):
+    vad_options = {"vad_onset": 0.500,"vad_offset": 0.363}
+    asr_options = {"temperatures": [0],"initial_prompt": "",}
+    rprint("[bold yellow] You can ignore warning of `Model was trained with torch 1.10.0+cu102, yours is 2.0.0+cu118...`[/bold yellow]")
+    return whisperx.load_model(model_name, device, compute_type=compute_type, language=language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR)
+
+@functools.lru_cache(maxsize=1)
+def load_align_model(language_code, device):
+    model_a, metadata = whisperx.load_align_model(language_code=language_code, device=device)
+    if device == "cpu":
+        # dynamic int8 Linear layers: wav2vec2 alignment is Linear-bound on CPU
+        model_a = torch.ao.quantization.quantize_dynamic(model_a, {torch.nn.Linear}, dtype=torch.qint8)
+    return model_a, metadata
+
+def get_compute_type_override(default):
+    # whisper.compute_type is optional; older config.yaml files do not have it
+    try:
+        return load_key("whisper.compute_type") or default
+    except KeyError:
+        return default
+
 @except_handler("WhisperX processing error:")
 def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
     os.environ['HF_ENDPOINT'] = check_hf_mirror()
@@ -45,11 +127,17 @@ def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
     if device == "cuda":
         gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
         batch_size = 16 if gpu_mem > 8 else 2
-        compute_type = "float16" if torch.cuda.is_bf16_supported() else "int8"
+        # small cards cannot hold the whisper and align models at once; load each only while it is used
+        low_vram = gpu_mem <= 8
+        # int8 weights with fp16 activations: ~half the VRAM of float16 at near-identical WER;
+        # pre-Volta GPUs have no fp16 kernels for it, fall back to plain int8 there
+        compute_type = "int8_float16" if "int8_float16" in ctranslate2.get_supported_compute_types("cuda") else "int8"
+        compute_type = get_compute_type_override(compute_type)
         rprint(f"[cyan]🎮 GPU memory:[/cyan] {gpu_mem:.2f} GB, [cyan]📦 Batch size:[/cyan] {batch_size}, [cyan]⚙️ Compute type:[/cyan] {compute_type}")
     else:
         batch_size = 1
-        compute_type = "int8"
+        low_vram = False
+        compute_type = get_compute_type_override("int8")
         rprint(f"[cyan]📦 Batch size:[/cyan] {batch_size}, [cyan]⚙️ Compute type:[/cyan] {compute_type}")
     rprint(f"[green]▶️ Starting WhisperX for segment {start:.2f}s to {end:.2f}s...[/green]")
     
@@ -66,15 +154,9 @@ def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
     else:
         rprint(f"[green]📥 Using WHISPER model from HuggingFace:[/green] {model_name} ...")
 
-    vad_options = {"vad_onset": 0.500,"vad_offset": 0.363}
-    asr_options = {"temperatures": [0],"initial_prompt": "",}
     whisper_language = None if 'auto' in WHISPER_LANGUAGE else WHISPER_LANGUAGE
-    rprint("[bold yellow] You can ignore warning of `Model was trained with torch 1.10.0+cu102, yours is 2.0.0+cu118...`[/bold yellow]")
-    model = whisperx.load_model(model_name, device, compute_type=compute_type, language=whisper_language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR)
+    model = load_resident(load_whisper_model, model_name, device, compute_type, whisper_language)
 
-    def load_audio_segment(audio_file, start, end):
-        audio, _ = librosa.load(audio_file, sr=16000, offset=start, duration=end - start, mono=True)
-        return audio
     raw_audio_segment = load_audio_segment(raw_audio_file, start, end)
     vocal_audio_segment = load_audio_segment(vocal_audio_file, start, end)
     
@@ -83,13 +165,13 @@ def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
     # -------------------------
     transcribe_start_time = time.time()
     rprint("[bold green]Note: You will see Progress if working correctly ↓[/bold green]")
-    result = model.transcribe(raw_audio_segment, batch_size=batch_size, print_progress=True)
+    with torch.inference_mode():
+        result = model.transcribe(raw_audio_segment, batch_size=batch_size, print_progress=True)
     transcribe_time = time.time() - transcribe_start_time
     rprint(f"[cyan]⏱️ time transcribe:[/cyan] {transcribe_time:.2f}s")
-
-    # Free GPU resources
     del model
-    torch.cuda.empty_cache()
+    if low_vram:
+        release_models(load_whisper_model)
 
     # Save language
     update_key("whisper.language", result['language'])
@@ -101,14 +183,17 @@ def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
     # -------------------------
     align_start_time = time.time()
     # Align timestamps using vocal audio
-    model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
-    result = whisperx.align(result["segments"], model_a, metadata, vocal_audio_segment, device, return_char_alignments=False)
+    model_a, metadata = load_resident(load_align_model, result["language"], device)
+    if device == "cuda":
+        # one pinned host->device copy; align then slices on the GPU instead of copying each sub-segment
+        vocal_audio_segment = torch.from_numpy(vocal_audio_segment).pin_memory().to(device, non_blocking=True)
+    with torch.inference_mode():
+        result = whisperx.align(result["segments"], model_a, metadata, vocal_audio_segment, device, return_char_alignments=False)
     align_time = time.time() - align_start_time
     rprint(f"[cyan]⏱️ time align:[/cyan] {align_time:.2f}s")
-
-    # Free GPU resources again
-    torch.cuda.empty_cache()
-    del model_a
+    del model_a, vocal_audio_segment
+    if low_vram:
+        release_models(load_align_model)
 
     # Adjust timestamps
     for segment in result['segments']:
@@ -1,10 +1,28 @@
-# use try-except to avoid error when installing
-try:
-    from .ask_gpt import ask_gpt
-    from .decorator import except_handler, check_file_exists
-    from .config_utils import load_key, update_key, get_joiner
-    from rich import print as rprint
-except ImportError:
-    pass
-
-__all__ = ["ask_gpt", "except_handler", "check_file_exists", "load_key", "update_key", "rprint", "get_joiner"]
\ No newline at end of file
+import importlib
+
+# ------------
+# lazy exports (PEP 562): importing core.utils.config_utils during install
+# must not pull in openai through ask_gpt
+# ------------
+
+_LAZY_ATTRS = {
+    "ask_gpt": ".ask_gpt",
+    "except_handler": ".decorator",
+    "check_file_exists": ".decorator",
+    "load_key": ".config_utils",
+    "update_key": ".config_utils",
+    "get_joiner": ".config_utils",
+}
+
+def __getattr__(name):
+    if name == "rprint":
+        from rich import print as value
+    elif name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # cache on the package; this also replaces the `ask_gpt` submodule attribute with the function
+    globals()[name] = value
+    return value
+
+__all__ = ["ask_gpt", "except_handler", "check_file_exists", "load_key", "update_key", "rprint", "get_joiner"]
@@ -1,4 +1,6 @@
 from ruamel.yaml import YAML
+import copy
+import os
 import threading
 
 CONFIG_PATH = 'config.yaml'
@@ -7,14 +9,26 @@ lock = threading.Lock()
 yaml = YAML()
 yaml.preserve_quotes = True
 
+# parsed config.yaml, reused until the file's size or mtime changes
+_config_cache = {'stamp': None, 'data': None}
+
 # -----------------------
 # load & update config
 # -----------------------
 
+def _load_config():
+    # caller must hold `lock`
+    st = os.stat(CONFIG_PATH)
+    stamp = (st.st_size, st.st_mtime_ns)
+    if _config_cache['stamp'] != stamp:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
+            _config_cache['data'] = yaml.load(file)
+        _config_cache['stamp'] = stamp
+    return _config_cache['data']
+
 def load_key(key):
     with lock:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-            data = yaml.load(file)
+        data = _load_config()
 
     keys = key.split('.')
     value = data
@@ -23,12 +37,12 @@ def load_key(key):
             value = value[k]
         else:
             raise KeyError(f"Key '{k}' not found in configuration")
-    return value
+    # callers get their own copy of nested sections, never the cached objects
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
 
 def update_key(key, new_value):
     with lock:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-            data = yaml.load(file)
+        data = _load_config()
 
         keys = key.split('.')
         current = data
@@ -42,6 +56,8 @@ def update_key(key, new_value):
             current[keys[-1]] = new_value
             with open(CONFIG_PATH, 'w', encoding='utf-8') as file:
                 yaml.dump(data, file)
+            st = os.stat(CONFIG_PATH)
+            _config_cache['stamp'] = (st.st_size, st.st_mtime_ns)
             return True
         else:
             raise KeyError(f"Key '{keys[-1]}' not found in configuration")
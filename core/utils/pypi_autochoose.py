@@ -1,7 +1,6 @@
 import subprocess
 import time
 import requests
-import os
 import concurrent.futures
 from rich.console import Console
 from rich.table import Table
@@ -19,13 +18,6 @@ console = Console()
 FAST_THRESHOLD = 3000  # ms
 SLOW_THRESHOLD = 5000  # ms
 
-def get_optimal_thread_count():
-    try:
-        cpu_count = os.cpu_count()
-        return max(cpu_count - 1, 1)
-    except:
-        return 2
-
 def test_mirror_speed(name, url):
     try:
         start_time = time.time()
@@ -68,7 +60,8 @@ def main():
     ) as progress:
         progress.add_task("", total=None)  # Indeterminate spinner
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=get_optimal_thread_count()) as executor:
+        # probes are network-bound, so run one thread per mirror regardless of cpu count
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(MIRRORS)) as executor:
             future_to_mirror = {executor.submit(test_mirror_speed, name, url): name 
                               for name, url in MIRRORS.items()}
             
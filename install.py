@@ -4,6 +4,9 @@ import subprocess
 import shutil
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# resolved once, every install step branches on it
+SYSTEM = platform.system()
+
 ascii_logo = """
 __     ___     _            _     _                    
 \ \   / (_) __| | ___  ___ | |   (_)_ __   __ _  ___  
@@ -17,64 +20,58 @@ def install_package(*packages):
     subprocess.check_call([sys.executable, "-m", "pip", "install", *packages])
 
 def check_nvidia_gpu():
-    install_package("pynvml")
-    import pynvml
     from translations.translations import translate as t
-    initialized = False
+    if os.environ.get("VIDEOLINGO_NO_GPU"):
+        print(t("VIDEOLINGO_NO_GPU is set, skipping GPU detection"))
+        return False
+    # nvidia-smi ships with the driver, so a missing binary means no usable GPU
+    if shutil.which("nvidia-smi") is None:
+        print(t("No NVIDIA GPU detected"))
+        return False
     try:
-        pynvml.nvmlInit()
-        initialized = True
-        device_count = pynvml.nvmlDeviceGetCount()
-        if device_count > 0:
-            print(t("Detected NVIDIA GPU(s)"))
-            for i in range(device_count):
-                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                name = pynvml.nvmlDeviceGetName(handle)
-                print(f"GPU {i}: {name}")
-            return True
-        else:
-            print(t("No NVIDIA GPU detected"))
-            return False
-    except pynvml.NVMLError:
+        result = subprocess.run(["nvidia-smi", "--query-gpu=name,driver_version,memory.total", "--format=csv,noheader,nounits"],
+                                capture_output=True, encoding="utf-8", errors="replace", check=True, timeout=10)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
         print(t("No NVIDIA GPU detected or NVIDIA drivers not properly installed"))
         return False
-    finally:
-        if initialized:
-            pynvml.nvmlShutdown()
 
-def check_ffmpeg():
-    from rich.console import Console
+    gpus = [line.rsplit(',', 2) for line in result.stdout.splitlines() if line.strip()]
+    if not gpus:
+        print(t("No NVIDIA GPU detected"))
+        return False
+    print(t("Detected NVIDIA GPU(s)"))
+    for i, (name, driver_version, memory_total) in enumerate(gpus):
+        print(f"GPU {i}: {name.strip()} (driver {driver_version.strip()}, {memory_total.strip()} MiB)")
+    return True
+
+def check_ffmpeg(console):
     from rich.panel import Panel
     from translations.translations import translate as t
-    console = Console()
 
-    try:
-        # Check if ffmpeg is installed
-        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    # a PATH lookup is enough to tell whether ffmpeg is installed, no need to launch it
+    if shutil.which('ffmpeg') is not None:
         console.print(Panel(t("✅ FFmpeg is already installed"), style="green"))
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        system = platform.system()
-        install_cmd = ""
-        
-        if system == "Windows":
-            install_cmd = "choco install ffmpeg"
-            extra_note = t("Install Chocolatey first (https://chocolatey.org/)")
-        elif system == "Darwin":
-            install_cmd = "brew install ffmpeg"
-            extra_note = t("Install Homebrew first (https://brew.sh/)")
-        elif system == "Linux":
-            install_cmd = "sudo apt install ffmpeg  # Ubuntu/Debian\nsudo yum install ffmpeg  # CentOS/RHEL"
-            extra_note = t("Use your distribution's package manager")
-        
-        console.print(Panel.fit(
-            t("❌ FFmpeg not found\n\n") +
-            f"{t('🛠️ Install using:')}\n[bold cyan]{install_cmd}[/bold cyan]\n\n" +
-            f"{t('💡 Note:')}\n{extra_note}\n\n" +
-            f"{t('🔄 After installing FFmpeg, please run this installer again:')}\n[bold cyan]python install.py[/bold cyan]",
-            style="red"
-        ))
-        raise SystemExit(t("FFmpeg is required. Please install it and run the installer again."))
+    install_cmd = ""
+    
+    if SYSTEM == "Windows":
+        install_cmd = "choco install ffmpeg"
+        extra_note = t("Install Chocolatey first (https://chocolatey.org/)")
+    elif SYSTEM == "Darwin":
+        install_cmd = "brew install ffmpeg"
+        extra_note = t("Install Homebrew first (https://brew.sh/)")
+    elif SYSTEM == "Linux":
+        install_cmd = "sudo apt install ffmpeg  # Ubuntu/Debian\nsudo yum install ffmpeg  # CentOS/RHEL"
+        extra_note = t("Use your distribution's package manager")
+    
+    console.print(Panel.fit(
+        t("❌ FFmpeg not found\n\n") +
+        f"{t('🛠️ Install using:')}\n[bold cyan]{install_cmd}[/bold cyan]\n\n" +
+        f"{t('💡 Note:')}\n{extra_note}\n\n" +
+        f"{t('🔄 After installing FFmpeg, please run this installer again:')}\n[bold cyan]python install.py[/bold cyan]",
+        style="red"
+    ))
+    raise SystemExit(t("FFmpeg is required. Please install it and run the installer again."))
 
 def main():
     install_package("requests", "rich", "ruamel.yaml", "InquirerPy")
@@ -125,14 +122,14 @@ def main():
         choose_mirror()
 
     # Detect system and GPU
-    has_gpu = platform.system() != 'Darwin' and check_nvidia_gpu()
+    has_gpu = SYSTEM != 'Darwin' and check_nvidia_gpu()
     if has_gpu:
         console.print(Panel(t("🎮 NVIDIA GPU detected, installing CUDA version of PyTorch..."), style="cyan"))
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "torch==2.0.0", "torchaudio==2.0.0", "--index-url", "https://download.pytorch.org/whl/cu118"])
+        install_package("torch==2.0.0", "torchaudio==2.0.0", "--index-url", "https://download.pytorch.org/whl/cu118")
     else:
-        system_name = "🍎 MacOS" if platform.system() == 'Darwin' else "💻 No NVIDIA GPU"
+        system_name = "🍎 MacOS" if SYSTEM == 'Darwin' else "💻 No NVIDIA GPU"
         console.print(Panel(t(f"{system_name} detected, installing CPU version of PyTorch... Note: it might be slow during whisperX transcription."), style="cyan"))
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "torch==2.1.2", "torchaudio==2.1.2"])
+        install_package("torch==2.1.2", "torchaudio==2.1.2")
 
     @except_handler("Failed to install project")
     def install_requirements():
@@ -145,23 +142,32 @@ def main():
         if os.path.exists('/etc/debian_version'):
             # Debian/Ubuntu systems
             cmd = ['sudo', 'apt-get', 'install', '-y', 'fonts-noto']
+            check_cmd, installed_marker = ['dpkg-query', '-W', '-f=${Status}', 'fonts-noto'], "install ok installed"
             pkg_manager = "apt-get"
         elif os.path.exists('/etc/redhat-release'):
             # RHEL/CentOS/Fedora systems
             cmd = ['sudo', 'yum', 'install', '-y', 'google-noto*']
+            # many google-noto packages ship by default; only the CJK fonts tell us the install already ran
+            check_cmd, installed_marker = ['rpm', '-qa', 'google-noto*cjk*'], "cjk"
             pkg_manager = "yum"
         else:
             console.print("Warning: Unrecognized Linux distribution, please install Noto fonts manually", style="yellow")
             return
 
+        # skip sudo + package manager run when the fonts are already there
+        installed = subprocess.run(check_cmd, capture_output=True, text=True)
+        if installed_marker in installed.stdout:
+            console.print("✅ Noto fonts are already installed", style="green")
+            return
+
         subprocess.run(cmd, check=True)
         console.print(f"✅ Successfully installed Noto fonts using {pkg_manager}", style="green")
 
-    if platform.system() == 'Linux':
+    if SYSTEM == 'Linux':
         install_noto_font()
     
     install_requirements()
-    check_ffmpeg()
+    check_ffmpeg(console)
     
     # First panel with installation complete and startup command
     panel1_text = (
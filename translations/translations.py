@@ -1,4 +1,5 @@
 import json
+import functools
 
 DISPLAY_LANGUAGES = {
     "🇬🇧 English": "en",
@@ -10,7 +11,8 @@ DISPLAY_LANGUAGES = {
     "🇫🇷 Français": "fr",
 }
 
-# Load the language file based on user selection
+# Load the language file based on user selection, parsed once per language
+@functools.lru_cache(maxsize=None)
 def load_translations(language="en"):
     with open(f'translations/{language}.json', 'r', encoding='utf-8') as file:
         return json.load(file)